@@ -1,29 +1,80 @@
+import os
+import re
 import json
+import time
+import random
 import google.generativeai as genai
+from google.api_core.exceptions import ResourceExhausted
+
+
+# 已解析的 JSON 檔案快取，鍵為檔案路徑，值為 (mtime, 載入時間, 內容)
+_json_cache: dict = {}
+
+# 快取有效秒數，超過後才檢查檔案 mtime
+JSON_CACHE_TTL = 60.0
+
+
+def _cached_json(path: str, ttl: float = JSON_CACHE_TTL):
+    """
+    讀取 JSON 檔案（含記憶體快取）
+    
+    TTL 內直接回傳快取；超過 TTL 時檢查 mtime，檔案有變動才重新解析
+    """
+    now = time.time()
+    cached = _json_cache.get(path)
+    if cached is not None:
+        mtime, loaded_at, value = cached
+        if now - loaded_at < ttl:
+            return value
+        if os.path.getmtime(path) == mtime:
+            _json_cache[path] = (mtime, now, value)
+            return value
+    
+    mtime = os.path.getmtime(path)
+    with open(path, "r", encoding="utf-8") as f:
+        value = json.load(f)
+    _json_cache[path] = (mtime, now, value)
+    return value
 
 
 class APIKeyManager:
-    """API Key 輪詢管理器"""
+    """
+    API Key 輪詢管理器
+    
+    每次存取都經由快取重新取得 key 清單，編輯 api_keys.json 後不需重啟即可生效
+    """
     
     def __init__(self, api_file: str = "api_keys.json"):
         self.api_file = api_file
-        self.api_keys = self._load_api_keys()
         self.current_index = 0
-        self.total_keys = len(self.api_keys)
     
     def _load_api_keys(self) -> list:
         """從 api_keys.json 載入所有 API keys"""
-        with open(self.api_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = _cached_json(self.api_file)
         return data["api_keys"]
     
+    @property
+    def api_keys(self) -> list:
+        """目前的 API key 清單"""
+        return self._load_api_keys()
+    
+    @property
+    def total_keys(self) -> int:
+        """目前的 API key 數量"""
+        return len(self.api_keys)
+    
+    def _current(self) -> dict:
+        """目前輪到的 key（清單長度變動時以取餘數對齊）"""
+        api_keys = self.api_keys
+        return api_keys[self.current_index % len(api_keys)]
+    
     def get_current_key(self) -> str:
         """取得目前的 API key"""
-        return self.api_keys[self.current_index]["key"]
+        return self._current()["key"]
     
     def get_current_key_name(self) -> str:
         """取得目前的 API key 名稱"""
-        return self.api_keys[self.current_index]["name"]
+        return self._current()["name"]
     
     def rotate_key(self):
         """切換到下一個 API key"""
@@ -37,15 +88,36 @@ class APIKeyManager:
 
 def load_config(config_file: str = "config.json") -> dict:
     """從 config.json 載入設定"""
-    with open(config_file, "r", encoding="utf-8") as f:
-        config = json.load(f)
-    return config
+    return _cached_json(config_file)
+
+
+# 已建立的 Gemini 模型快取，鍵為 (api_key, 設定簽章)
+_model_cache: dict = {}
+
+# genai.configure 為行程全域設定，記錄目前套用的 key 以省略重複設定
+_last_configured_key = None
+
+
+def _config_signature(config: dict) -> tuple:
+    """將影響模型建立的設定轉成可雜湊的簽章"""
+    return (
+        config.get("model", "gemini-2.0-flash"),
+        config.get("system_prompt", ""),
+        config.get("temperature", 0.7),
+        config.get("max_output_tokens", 2048),
+        config.get("top_p", 0.95),
+        config.get("top_k", 40),
+    )
 
 
 def create_gemini_model(api_key: str, config: dict):
     """建立並設定 Gemini 模型"""
+    global _last_configured_key
+    
     # 設定 API key
-    genai.configure(api_key=api_key)
+    if api_key != _last_configured_key:
+        genai.configure(api_key=api_key)
+        _last_configured_key = api_key
     
     # 設定生成參數
     generation_config = genai.GenerationConfig(
@@ -65,34 +137,91 @@ def create_gemini_model(api_key: str, config: dict):
     return model
 
 
+def get_gemini_model(api_key: str, config: dict):
+    """取得快取的 Gemini 模型，未命中時才建立"""
+    cache_key = (api_key, _config_signature(config))
+    model = _model_cache.get(cache_key)
+    if model is None:
+        model = create_gemini_model(api_key, config)
+        _model_cache[cache_key] = model
+    return model
+
+
 def chat_with_gemini(model, user_message: str) -> str:
     """與 Gemini 進行對話"""
     response = model.generate_content(user_message)
     return response.text
 
 
-def chat_with_retry(key_manager: APIKeyManager, config: dict, user_message: str, max_retries: int = None) -> str:
-    """帶有自動輪詢重試的對話功能"""
-    last_error = None
+def chat_with_gemini_stream(model, user_message: str):
+    """與 Gemini 進行串流對話，逐段產生回應文字"""
+    response = model.generate_content(user_message, stream=True)
+    for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+
+# 配額或速率限制錯誤訊息的關鍵字
+_QUOTA_RE = re.compile(r"quota|rate|limit|429|resource")
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """檢查是否為配額或速率限制錯誤"""
+    if isinstance(error, ResourceExhausted):
+        return True
+    return _QUOTA_RE.search(str(error).lower()) is not None
+
+
+# 所有 key 都輪過一輪後的指數退避參數（秒）
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 32.0
+
+
+def _rotate_with_backoff(key_manager: APIKeyManager, attempt: int, max_retries: int):
+    """
+    切換到下一個 key；若所有 key 都已輪過一輪，則以指數退避加完全抖動等待
     
-    # 預設輪詢所有可用的 API keys
+    等待秒數為 random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** 輪數))
+    """
+    print(f"[警告] {key_manager.get_current_key_name()} 已達限制（第 {attempt + 1} 次嘗試），嘗試切換...")
+    key_manager.rotate_key()
+    
+    next_attempt = attempt + 1
+    if next_attempt >= max_retries or next_attempt % key_manager.total_keys != 0:
+        return
+    
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (next_attempt // key_manager.total_keys)))
+    print(f"[退避] 所有 API keys 皆已達限制，等待 {delay:.2f} 秒後重試...")
+    time.sleep(delay)
+
+
+def chat_with_retry(key_manager: APIKeyManager, config: dict, user_message: str, max_retries: int = None, stream: bool = False):
+    """
+    帶有自動輪詢重試的對話功能
+
+    stream=True 時回傳 generator，逐段產生回應文字
+    """
+    # 預設輪詢所有可用的 API keys 三輪（每輪之間退避等待）
     if max_retries is None:
-        max_retries = key_manager.total_keys
+        max_retries = key_manager.total_keys * 3
+    
+    if stream:
+        return _chat_stream_with_retry(key_manager, config, user_message, max_retries)
+    
+    last_error = None
     
     for attempt in range(max_retries):
         try:
             api_key = key_manager.get_current_key()
-            model = create_gemini_model(api_key, config)
+            model = get_gemini_model(api_key, config)
             response = chat_with_gemini(model, user_message)
             return response
         except Exception as e:
             last_error = e
-            error_msg = str(e).lower()
             
             # 檢查是否為配額或速率限制錯誤
-            if "quota" in error_msg or "rate" in error_msg or "limit" in error_msg or "429" in error_msg or "resource" in error_msg:
-                print(f"[警告] {key_manager.get_current_key_name()} 已達限制，嘗試切換...")
-                key_manager.rotate_key()
+            if _is_rate_limit_error(e):
+                _rotate_with_backoff(key_manager, attempt, max_retries)
             else:
                 # 其他錯誤直接拋出
                 raise e
@@ -100,6 +229,31 @@ def chat_with_retry(key_manager: APIKeyManager, config: dict, user_message: str,
     raise Exception(f"所有 API keys 都已嘗試失敗。最後錯誤: {last_error}")
 
 
+def _chat_stream_with_retry(key_manager: APIKeyManager, config: dict, user_message: str, max_retries: int):
+    """串流版的輪詢重試（只有在尚未產生任何文字前才會切換 key 重試）"""
+    last_error = None
+    
+    for attempt in range(max_retries):
+        started = False
+        try:
+            api_key = key_manager.get_current_key()
+            model = get_gemini_model(api_key, config)
+            for delta in chat_with_gemini_stream(model, user_message):
+                started = True
+                yield delta
+            return
+        except Exception as e:
+            last_error = e
+            
+            # 已經送出部分文字就無法重來，直接拋出
+            if not started and _is_rate_limit_error(e):
+                _rotate_with_backoff(key_manager, attempt, max_retries)
+            else:
+                raise e
+    
+    raise Exception(f"所有 API keys 都已嘗試失敗。最後錯誤: {last_error}")
+
+
 def main():
     # 載入設定
     key_manager = APIKeyManager()
@@ -0,0 +1,16 @@
+"""
+Gunicorn 設定（Linux / macOS 正式部署）
+
+啟動方式: gunicorn -c gunicorn.conf.py server:app
+
+XTTS 模型每個行程各佔一份 CUDA context 與約 2 GB 記憶體，
+因此只開一個 worker，改以執行緒數量提升並行度。
+"""
+
+bind = "0.0.0.0:5000"
+worker_class = "gthread"
+workers = 1
+threads = 8
+
+# 串流 TTS 回應可能持續數十秒
+timeout = 120
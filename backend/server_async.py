@@ -0,0 +1,240 @@
+"""
+AI 導覽員 API 伺服器（非同步串流版）
+
+串流端點 /api/chat/stream 與 /api/tts/stream 改由 FastAPI 的 StreamingResponse 處理，
+TTS 工作執行緒的輸出直接送進事件迴圈，音訊串流期間不佔用任何執行緒；其餘端點（/api/chat、/api/speaker、前端頁面等）
+仍交給 server.py 的 Flask app。
+
+啟動方式: uvicorn server_async:app --host 0.0.0.0 --port 5000 --workers 1
+（XTTS 模型每個行程各佔一份 CUDA context，固定 1 個 worker）
+"""
+
+import asyncio
+import functools
+import threading
+import uuid
+
+import orjson
+from a2wsgi import WSGIMiddleware
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 共用 server.py 已載入的模型與管線
+import server
+from server import _tts_jobs, _tts_semaphore, _stream_on_worker, _produce_sentences
+
+
+app = FastAPI(title="AI 導覽員 API (非同步串流版)")
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Content-Type", "ngrok-skip-browser-warning"],
+    expose_headers=["X-Stream-Id"]
+)
+
+
+class _LoopQueue:
+    """
+    讓其他執行緒以 put() 將項目直接交給事件迴圈上的 asyncio.Queue
+    
+    可取代 queue.Queue 傳給 TTS 工作執行緒或 Gemini 生產者執行緒，
+    事件迴圈端直接 await，不需另外佔用執行緒等待。
+    """
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self.items = asyncio.Queue()
+    
+    def put(self, item):
+        self._loop.call_soon_threadsafe(self.items.put_nowait, item)
+
+
+async def _acquire_tts_slot():
+    """取得 server.py 共用的 TTS 請求名額；名額用完時在事件迴圈上輪詢等待，不佔用執行緒"""
+    while not _tts_semaphore.acquire(blocking=False):
+        await asyncio.sleep(0.05)
+
+
+async def run_tts_job(job):
+    """
+    將合成工作交給 TTS 工作執行緒，結果直接送進事件迴圈（_run_tts_job 的非同步版本）
+    
+    客戶端中斷時串流被取消，立即通知工作執行緒停止並關閉推理 generator。
+    
+    Args:
+        job: 無參數、回傳可迭代結果的函式（在工作執行緒中呼叫）
+        
+    Yields:
+        工作產生的項目
+    """
+    out_queue = _LoopQueue(asyncio.get_running_loop())
+    cancelled = threading.Event()
+    _tts_jobs.put((job, out_queue, cancelled))
+    try:
+        while True:
+            item = await out_queue.items.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+
+
+async def stream_speech(text: str, stream_chunk_size: int, language: str):
+    """串流生成語音（generate_speech_streaming 的非同步版本，PCM 區塊為 memoryview）"""
+    await _acquire_tts_slot()
+    try:
+        async for chunk in run_tts_job(
+            functools.partial(_stream_on_worker, text, stream_chunk_size, language, True, True)
+        ):
+            yield chunk
+    finally:
+        _tts_semaphore.release()
+
+
+async def start_chat_stream(user_text: str):
+    """
+    開始串流呼叫 Gemini，並等待第一句完成（server.start_chat_stream 的非同步版本）
+    
+    Returns:
+        (stream_id, 第一句, 其餘句子的 asyncio.Queue)
+    """
+    print("[Gemini] 正在串流生成回應...")
+    stream_id = uuid.uuid4().hex
+    sentence_queue = _LoopQueue(asyncio.get_running_loop())
+    threading.Thread(
+        target=_produce_sentences,
+        args=(user_text, stream_id, sentence_queue),
+        daemon=True
+    ).start()
+    
+    first_sentence = await sentence_queue.items.get()
+    if isinstance(first_sentence, Exception):
+        raise first_sentence
+    if first_sentence is None:
+        raise Exception("Gemini 未產生任何回應")
+    
+    return stream_id, first_sentence, sentence_queue.items
+
+
+async def stream_speech_pipelined(first_sentence: str, sentences: asyncio.Queue, stream_chunk_size: int):
+    """逐句串流生成語音（generate_speech_pipelined 的非同步版本，PCM 區塊為 memoryview）"""
+    sentence = first_sentence
+    index = 0
+    await _acquire_tts_slot()
+    try:
+        while sentence is not None:
+            if isinstance(sentence, Exception):
+                print(f"[錯誤] Gemini 串流中斷: {sentence}")
+                break
+            
+            async for chunk in run_tts_job(functools.partial(
+                _stream_on_worker,
+                sentence,
+                max(1, stream_chunk_size // 2) if index == 0 else stream_chunk_size,
+                "zh-cn",
+                index == 0,
+                True
+            )):
+                yield chunk
+            index += 1
+            sentence = await sentences.get()
+    finally:
+        _tts_semaphore.release()
+    
+    print(f"[TTS] 串流完成，共 {index} 句")
+
+
+async def _read_json(request: Request):
+    """讀取請求 JSON，格式錯誤時回傳 None"""
+    try:
+        return orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        return None
+
+
+@app.post("/api/chat/stream")
+async def chat_and_speak_stream(request: Request):
+    """
+    串流版本：接收用戶文字，透過 Gemini 生成回應，再串流回傳語音
+    
+    Request / Response 格式同 server.py 的 /api/chat/stream
+    """
+    try:
+        data = await _read_json(request)
+        
+        if not isinstance(data, dict) or "text" not in data:
+            return JSONResponse({"error": "請提供 'text' 欄位"}, status_code=400)
+        
+        user_text = data["text"].strip()
+        stream_chunk_size = data.get("stream_chunk_size", 20)
+        
+        if not user_text:
+            return JSONResponse({"error": "文字內容不可為空"}, status_code=400)
+        
+        print(f"[請求-串流] 收到文字: {user_text[:50]}...")
+        
+        stream_id, first_sentence, sentences = await start_chat_stream(user_text)
+        
+        print("[TTS] 開始逐句串流生成語音...")
+        return StreamingResponse(
+            stream_speech_pipelined(first_sentence, sentences, stream_chunk_size),
+            media_type="audio/wav",
+            headers={"X-Stream-Id": stream_id}
+        )
+    
+    except Exception as e:
+        print(f"[錯誤] {str(e)}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.post("/api/tts/stream")
+async def tts_stream_only(request: Request):
+    """
+    純 TTS 串流端點：直接將文字轉換為串流語音
+    
+    Request / Response 格式同 server.py 的 /api/tts/stream
+    """
+    try:
+        data = await _read_json(request)
+        
+        if not isinstance(data, dict) or "text" not in data:
+            return JSONResponse({"error": "請提供 'text' 欄位"}, status_code=400)
+        
+        text = data["text"].strip()
+        language = data.get("language", "zh-cn")
+        stream_chunk_size = data.get("stream_chunk_size", 20)
+        
+        if not text:
+            return JSONResponse({"error": "文字內容不可為空"}, status_code=400)
+        
+        print(f"[TTS 串流] 開始處理: {text[:50]}...")
+        
+        return StreamingResponse(
+            stream_speech(text, stream_chunk_size, language),
+            media_type="audio/wav"
+        )
+    
+    except Exception as e:
+        print(f"[錯誤] {str(e)}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+# 其餘端點交給 Flask
+app.mount("/", WSGIMiddleware(server.app))
+
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    print("=" * 50)
+    print("AI 導覽員 API 伺服器 (非同步串流版)")
+    print("=" * 50)
+    print("\n啟動伺服器於 http://localhost:5000")
+    print("=" * 50)
+    
+    uvicorn.run(app, host="0.0.0.0", port=5000, workers=1)
@@ -10,16 +10,46 @@ XTTS v2 串流音訊生成模組
 """
 
 import os
-import io
-import wave
+import glob
+import base64
+import queue
+import struct
+import functools
+import threading
+import hashlib
+import tempfile
+import contextlib
+import collections
+import importlib.util
 import torch
 import numpy as np
-from typing import Iterator, Optional, List, Tuple
+from typing import Iterator, Optional, List, Tuple, Union
 
-from TTS.tts.configs.xtts_config import XttsConfig
-from TTS.tts.models.xtts import Xtts
-from TTS.utils.generic_utils import get_user_data_dir
-from TTS.utils.manage import ModelManager
+# TTS 套件在建立 XTTSStreamingTTS 時才匯入：只用到靜態方法（如 encode_audio_to_wav）的程式
+# 不必載入 XTTS 與 transformers
+
+
+# 推理精度設定 → autocast 型別（None 表示不使用 autocast）
+_AUTOCAST_DTYPES = {
+    "fp16": torch.float16,
+    "bf16": torch.bfloat16,
+    "fp32": None,
+}
+
+
+# tts_stream_to_file 累積多少位元組後寫入一次
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def _pack_wav_header(riff_size: int, data_size: int, sample_rate: int, sample_width: int, channels: int) -> bytes:
+    """打包 44 位元組的 PCM WAV 標頭"""
+    block_align = channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8,
+        b"data", data_size
+    )
 
 
 class XTTSStreamingTTS:
@@ -33,7 +63,13 @@ class XTTSStreamingTTS:
         self,
         model_path: Optional[str] = None,
         device: Optional[str] = None,
-        use_deepspeed: bool = False  # Windows 上建議設為 False
+        use_deepspeed: bool = False,  # Windows 上建議設為 False
+        latent_cache_dir: Optional[str] = None,
+        embedding_precision: str = "fp32",
+        compile_gpt: bool = False,
+        speaker_cache_size: int = 32,
+        text_cache_size: int = 256,
+        quantize_gpt: bool = False
     ):
         """
         初始化 XTTS 模型
@@ -42,10 +78,40 @@ class XTTSStreamingTTS:
             model_path: 自訂模型路徑，若為 None 則使用預設模型
             device: 運算裝置 ("cuda" 或 "cpu")，若為 None 則自動偵測
             use_deepspeed: 是否使用 DeepSpeed 加速 (Windows 不支援，建議設 False)
+            latent_cache_dir: 說話者特徵的磁碟緩存資料夾，若為 None 則使用預設位置
+            embedding_precision: GPU 推理的 autocast 精度 ("fp16"、"bf16"、"fp32"，
+                或 "auto" 於支援時使用 bf16)，GPT 權重也會轉成此精度；預設 fp32，需明確指定才啟用；
+                CPU 上僅 "bf16" 生效，其餘皆為 fp32
+            compile_gpt: 是否以 torch.compile 編譯 GPT 逐 token 解碼（kernel 融合，不使用 CUDA graphs；僅 CUDA）
+            speaker_cache_size: 記憶體中保留的說話者特徵數量上限，超過時淘汰最久未使用者
+            text_cache_size: 緩存的文字 token 數量上限（以句子與語言為鍵），0 表示不緩存
+            quantize_gpt: 是否將 GPT 轉換器的權重量化為 int8（GPU 需安裝 bitsandbytes，
+                CPU 使用 torch.ao 動態量化並改以 fp32 執行）
         """
+        from TTS.tts.configs.xtts_config import XttsConfig
+        from TTS.tts.models.xtts import Xtts
+        from TTS.utils.generic_utils import get_user_data_dir
+        from TTS.utils.manage import ModelManager
+        
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        # 裝置類型（"cuda:0" 之類帶編號的裝置也歸為 "cuda"），判斷裝置時一律使用此屬性
+        self.device_type = torch.device(self.device).type
         print(f"[XTTS] 使用裝置: {self.device}")
         
+        # XTTS 不可重入（推理狀態存在共用模組上），所有模型呼叫都必須持有此鎖
+        self._model_lock = threading.Lock()
+        
+        if self.device_type == "cuda":
+            if embedding_precision == "auto":
+                embedding_precision = "bf16" if torch.cuda.is_bf16_supported() else "fp16"
+            self.autocast_dtype = _AUTOCAST_DTYPES[embedding_precision]
+        else:
+            self._configure_cpu_threads()
+            # CPU 上只有明確指定 bf16 才使用（需 AVX-512-BF16 / AMX 才有加速），其餘維持 fp32；
+            # 動態量化需要 fp32 權重，量化時也維持 fp32
+            use_bf16 = embedding_precision == "bf16" and not quantize_gpt
+            self.autocast_dtype = torch.bfloat16 if use_bf16 else None
+        
         # 載入模型
         if model_path and os.path.exists(os.path.join(model_path, "config.json")):
             print(f"[XTTS] 載入自訂模型: {model_path}")
@@ -74,11 +140,372 @@ class XTTSStreamingTTS:
             eval=True,
             use_deepspeed=False  # 禁用 DeepSpeed 以避免 Windows 相容性問題
         )
+        if self.autocast_dtype is not None:
+            # 在 CPU 上先轉型再搬到 GPU，GPT 權重的上傳量與顯存佔用都減半
+            self._cast_gpt_decoder(self.autocast_dtype)
+            self._keep_vocoder_fp32()
+            print(f"[XTTS] GPT 解碼器使用 {self.autocast_dtype}")
+        if quantize_gpt:
+            # 需在搬到 GPU 前替換模組：bitsandbytes 在 .to("cuda") 時才實際量化權重
+            self._quantize_gpt()
         self.model.to(self.device)
         print("[XTTS] 模型載入完成！")
         
-        # 緩存說話者特徵
-        self._speaker_cache: dict = {}
+        if compile_gpt:
+            self._compile_gpt()
+        
+        # 串流區塊的 int16 轉換與 D2H 複製使用獨立 stream，與預設 stream 上的推理重疊
+        self._copy_stream = None
+        if self.device_type == "cuda":
+            self._copy_stream = torch.cuda.Stream(device=self.device)
+        
+        if text_cache_size > 0:
+            self._cache_text_tokens(text_cache_size)
+        
+        # 緩存說話者特徵（記憶體 LRU + 磁碟，磁碟緩存可跨行程沿用）
+        self._speaker_cache: collections.OrderedDict = collections.OrderedDict()
+        self.speaker_cache_size = speaker_cache_size
+        self.latent_cache_dir = latent_cache_dir or os.path.join(
+            get_user_data_dir("tts"), "xtts_speaker_latents"
+        )
+        os.makedirs(self.latent_cache_dir, exist_ok=True)
+    
+    def _cast_gpt_decoder(self, dtype: torch.dtype):
+        """
+        只將自回歸解碼用到的 GPT 權重轉成半精度（KV cache 也隨之為半精度）
+        
+        條件編碼器（conditioning_encoder / conditioning_perceiver）在 get_conditioning_latents 中
+        以 fp32 梅爾頻譜、不經 autocast 呼叫，權重必須維持 FP32，否則會發生 dtype 不符的錯誤
+        """
+        gpt = self.model.gpt
+        gpt.to(dtype)
+        for name in ("conditioning_encoder", "conditioning_perceiver"):
+            module = getattr(gpt, name, None)
+            if module is not None:
+                module.float()
+    
+    def _keep_vocoder_fp32(self):
+        """
+        讓 HiFi-GAN 聲碼器在 autocast 之外以 FP32 執行
+        
+        inference / inference_stream 在同一個 autocast 範圍內呼叫 GPT 與聲碼器；
+        聲碼器維持 FP32 避免雜音，輸出也維持 float32（bf16 張量無法直接 .numpy()）
+        """
+        decoder = self.model.hifigan_decoder
+        forward = decoder.forward
+        
+        def forward_fp32(latents, g=None):
+            with torch.autocast(device_type=self.device_type, enabled=False):
+                return forward(latents.float(), g=None if g is None else g.float())
+        
+        decoder.forward = forward_fp32
+    
+    def _compile_gpt(self):
+        """
+        以 torch.compile 編譯 GPT 每個 token 的前向運算（融合逐元素運算，減少 kernel 數）
+        
+        不使用 reduce-overhead：CUDA graphs 的錄製狀態屬於執行緒，而每個串流都在新的
+        _prefetch 執行緒上推理，預熱也在另一個執行緒；KV cache 長度又逐 token 增長，
+        每步都會重新錄製而得不償失。dynamic=True 讓長度變化不觸發重新編譯。
+        只替換 gpt_inference.forward：HF generate 逐步呼叫 self(...) 才會走到編譯版本，
+        直接包裝 model.gpt 則因推理走 generate 方法而不會生效。
+        編譯在第一次推理時才發生，建議載入後先預熱一次。CPU 上維持原本的 eager 模式。
+        """
+        if self.device_type != "cuda":
+            print("[XTTS] CPU 模式，略過 torch.compile")
+            return
+        
+        gpt_inference = self.model.gpt.gpt_inference
+        gpt_inference.forward = torch.compile(
+            gpt_inference.forward,
+            mode="default",
+            dynamic=True,
+            fullgraph=False
+        )
+        print("[XTTS] 已啟用 torch.compile")
+    
+    @staticmethod
+    def _replace_modules(module: torch.nn.Module, target: type, build) -> int:
+        """遞迴將 module 中所有 target 型別的子模組替換為 build(子模組) 的結果，回傳替換數量"""
+        count = 0
+        for name, child in module.named_children():
+            if isinstance(child, target):
+                setattr(module, name, build(child))
+                count += 1
+            else:
+                count += XTTSStreamingTTS._replace_modules(child, target, build)
+        return count
+    
+    @staticmethod
+    def _conv1d_to_linear(conv) -> torch.nn.Linear:
+        """HF GPT-2 的 Conv1D（權重為 in×out）轉成等價的 nn.Linear（權重為 out×in）"""
+        in_features, out_features = conv.weight.shape
+        linear = torch.nn.Linear(
+            in_features,
+            out_features,
+            bias=conv.bias is not None,
+            device=conv.weight.device,
+            dtype=conv.weight.dtype
+        )
+        linear.weight.data = conv.weight.data.t().contiguous()
+        if conv.bias is not None:
+            linear.bias.data = conv.bias.data
+        return linear
+    
+    @staticmethod
+    def _linear_to_int8(linear: torch.nn.Linear) -> torch.nn.Module:
+        """nn.Linear 轉成 bitsandbytes 的 int8 權重線性層（LLM.int8，離群值維持 fp16）"""
+        import bitsandbytes as bnb
+        
+        quantized = bnb.nn.Linear8bitLt(
+            linear.in_features,
+            linear.out_features,
+            bias=linear.bias is not None,
+            has_fp16_weights=False,
+            threshold=6.0
+        )
+        quantized.weight = bnb.nn.Int8Params(
+            linear.weight.data.half(), requires_grad=False, has_fp16_weights=False
+        )
+        if linear.bias is not None:
+            quantized.bias = torch.nn.Parameter(linear.bias.data.half(), requires_grad=False)
+        return quantized
+    
+    def _quantize_gpt(self):
+        """
+        將 GPT-2 轉換器（自回歸解碼的主要運算）的權重量化為 int8
+        
+        GPT-2 的注意力與 MLP 使用 HF 的 Conv1D，先轉成 nn.Linear 才能套用量化。
+        只量化轉換器本體（gpt_inference 共用同一組模組）；條件編碼器與 HiFi-GAN 聲碼器維持原精度。
+        GPU 使用 bitsandbytes 的 Linear8bitLt，CPU 使用 torch.ao 動態量化（fbgemm / VNNI）。
+        """
+        from transformers.pytorch_utils import Conv1D
+        
+        transformer = self.model.gpt.gpt
+        self._replace_modules(transformer, Conv1D, self._conv1d_to_linear)
+        
+        if self.device_type == "cuda":
+            if importlib.util.find_spec("bitsandbytes") is None:
+                raise ImportError("GPU 上的 int8 量化需要 bitsandbytes：pip install bitsandbytes")
+            count = self._replace_modules(transformer, torch.nn.Linear, self._linear_to_int8)
+        else:
+            count = sum(isinstance(m, torch.nn.Linear) for m in transformer.modules())
+            torch.ao.quantization.quantize_dynamic(
+                transformer, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+        print(f"[XTTS] GPT 轉換器已量化為 int8（{count} 個線性層）")
+    
+    def _cache_text_tokens(self, maxsize: int):
+        """
+        以 LRU 緩存 tokenizer.encode 的結果
+        
+        inference / inference_stream 對每個句子都會呼叫 tokenizer.encode，
+        中文需經過 jieba 斷詞與 pypinyin 轉換，重複的句子（問候語、固定提示）可直接沿用。
+        lru_cache 本身是執行緒安全的，多個串流的背景執行緒可同時使用。
+        """
+        encode = self.model.tokenizer.encode
+        
+        @functools.lru_cache(maxsize=maxsize)
+        def cached_encode(txt: str, lang: str) -> tuple:
+            return tuple(encode(txt, lang))
+        
+        def encode_with_cache(txt: str, lang: str) -> list:
+            # 回傳新的 list，呼叫端修改時不會影響緩存內容
+            return list(cached_encode(txt, lang))
+        
+        self.model.tokenizer.encode = encode_with_cache
+    
+    @staticmethod
+    def _configure_cpu_threads():
+        """
+        CPU 推理：運算子內部使用所有核心，運算子之間保留少量平行度
+        
+        set_num_threads 在執行期同時設定 OpenMP 與 MKL 的執行緒數，
+        不依賴 OMP_NUM_THREADS / MKL_NUM_THREADS（伺服器在匯入本模組前早已載入 torch）
+        """
+        torch.set_num_threads(os.cpu_count() or 1)
+        try:
+            torch.set_num_interop_threads(2)
+        except RuntimeError:
+            # 已有平行運算執行過（例如建立第二個實例）時不能再修改
+            pass
+        print(f"[XTTS] CPU 執行緒: intra-op {torch.get_num_threads()}, inter-op {torch.get_num_interop_threads()}")
+    
+    def _inference_context(self) -> contextlib.ExitStack:
+        """推理用的 context：inference_mode，設定精度時再加上 autocast"""
+        stack = contextlib.ExitStack()
+        stack.enter_context(torch.inference_mode())
+        if self.autocast_dtype is not None:
+            stack.enter_context(torch.autocast(device_type=self.device_type, dtype=self.autocast_dtype))
+        return stack
+    
+    def _iter_in_inference_context(self, iterator: Iterator) -> Iterator:
+        """
+        在推理 context 中逐一取出 iterator 的項目
+        
+        每次只在 next() 期間進入 context，後處理與 yield 時不受 autocast 影響
+        """
+        while True:
+            with self._inference_context():
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    
+    def _prefetch(self, iterator: Iterator, maxsize: int = 2, record_events: bool = False) -> Iterator:
+        """
+        以背景執行緒在推理 context 中預先取出 iterator 的項目
+        
+        GPU 推理下一個區塊的同時，呼叫端可以後處理並送出目前的區塊。
+        呼叫端提前關閉 generator 時，背景執行緒也會停止。
+        同一實例一次只有一個串流在推理，其餘串流的背景執行緒會等前一個結束或被關閉；
+        因此同一個執行緒不可交錯消費兩個串流。
+        
+        Args:
+            iterator: 推理結果的 iterator
+            maxsize: 最多預先取出的項目數
+            record_events: 是否改為交出 (項目, event)；event 在項目產生後立即記錄於
+                推理 stream 上，等待它只需等到該區塊完成，不必等後續已排入的 GPT 運算
+                （非 CUDA 張量時為 None）
+        """
+        items: queue.Queue = queue.Queue(maxsize=maxsize)
+        stop = threading.Event()
+        done = object()
+        
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    items.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        def produce():
+            try:
+                # 整段串流都持有模型鎖：GPT 的 prompt 前綴存在共用模組上，
+                # 另一個請求在中途開始推理會覆寫它
+                with self._model_lock:
+                    try:
+                        for item in self._iter_in_inference_context(iterator):
+                            if record_events:
+                                item = (item, self._record_ready(item))
+                            if not put(item):
+                                return
+                    finally:
+                        # 在鎖內關閉，確保推理完全結束後下一個請求才開始
+                        if hasattr(iterator, "close"):
+                            iterator.close()
+            except Exception as e:
+                put(e)
+            finally:
+                put(done)
+        
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                item = items.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+    
+    def _record_ready(self, item) -> Optional[torch.cuda.Event]:
+        """在目前 stream 上記錄 item 已產生完成的 event（無 copy stream 或非 CUDA 張量時回傳 None）"""
+        if self._copy_stream is None or not (isinstance(item, torch.Tensor) and item.is_cuda):
+            return None
+        ready = torch.cuda.Event()
+        ready.record(torch.cuda.current_stream(item.device))
+        return ready
+    
+    @staticmethod
+    def encode_tensor(tensor: torch.Tensor) -> dict:
+        """
+        將張量編碼為可 JSON 序列化的 fp16 原始位元組（base64）
+        
+        Args:
+            tensor: 要編碼的張量
+            
+        Returns:
+            {"shape": [...], "dtype": "float16", "data": "<base64>"}
+        """
+        array = tensor.detach().cpu().to(torch.float16).numpy()
+        return {
+            "shape": list(array.shape),
+            "dtype": "float16",
+            "data": base64.b64encode(array.tobytes()).decode("ascii"),
+        }
+    
+    @staticmethod
+    def decode_tensor(encoded: dict) -> np.ndarray:
+        """
+        還原 encode_tensor 的輸出
+        
+        Args:
+            encoded: encode_tensor 產生的字典
+            
+        Returns:
+            對應形狀與精度的 numpy 陣列
+        """
+        # bytearray 讓陣列可寫入，torch.from_numpy 不會發出警告
+        data = bytearray(base64.b64decode(encoded["data"]))
+        return np.frombuffer(data, dtype=np.dtype(encoded["dtype"])).reshape(encoded["shape"])
+    
+    def _to_device_tensor(self, value: Union[dict, list, np.ndarray, torch.Tensor]) -> torch.Tensor:
+        """
+        將 encode_tensor 字典 / list / numpy 陣列 / 張量轉成模型裝置上的 float32 張量
+        
+        已在裝置上的 float32 張量不會複製；fp16 資料以原精度傳輸後才在裝置上轉型
+        """
+        if isinstance(value, dict):
+            value = self.decode_tensor(value)
+        if not isinstance(value, torch.Tensor):
+            array = np.asarray(value)
+            if array.dtype not in (np.float16, np.float32):
+                array = array.astype(np.float32)
+            value = torch.from_numpy(array)
+        return value.to(self.device, non_blocking=True).float()
+    
+    def _latent_cache_path(self, speaker_wav: str) -> str:
+        """依 (檔案路徑, mtime, 大小, 模型路徑) 計算說話者特徵的磁碟緩存路徑"""
+        st = os.stat(speaker_wav)
+        key = hashlib.sha1(
+            f"{os.path.abspath(speaker_wav)}|{st.st_mtime_ns}|{st.st_size}|{self.model_path}".encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.latent_cache_dir, f"{key}.pt")
+    
+    def _load_cached_latents(self, path: str) -> Optional[Tuple[torch.Tensor, torch.Tensor]]:
+        """
+        讀取磁碟緩存的說話者特徵
+        
+        檔案不存在或無法讀取（例如寫入中斷留下的殘檔）時視為未命中，並刪除損壞的檔案
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            data = torch.load(path, map_location=self.device, weights_only=True)
+            return data["gpt"].float(), data["spk"].float()
+        except Exception as e:
+            print(f"[XTTS] 磁碟緩存損壞，重新計算: {path} ({e})")
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            return None
+    
+    def _save_cached_latents(self, path: str, gpt_cond_latent: torch.Tensor, speaker_embedding: torch.Tensor):
+        """先寫入同資料夾的暫存檔再 os.replace，其他行程不會讀到寫到一半的檔案"""
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                torch.save({"gpt": gpt_cond_latent.half().cpu(), "spk": speaker_embedding.half().cpu()}, f)
+            os.replace(temp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            raise
     
     def get_conditioning_latents(
         self,
@@ -99,33 +526,77 @@ class XTTSStreamingTTS:
         
         if use_cache and cache_key in self._speaker_cache:
             print(f"[XTTS] 使用緩存的說話者特徵: {speaker_wav}")
+            self._speaker_cache.move_to_end(cache_key)
             return self._speaker_cache[cache_key]
         
-        print(f"[XTTS] 計算說話者特徵: {speaker_wav}")
-        with torch.inference_mode():
-            gpt_cond_latent, speaker_embedding = self.model.get_conditioning_latents(
-                speaker_wav
-            )
+        disk_path = self._latent_cache_path(speaker_wav) if use_cache else None
+        cached = self._load_cached_latents(disk_path) if disk_path else None
+        if cached is not None:
+            print(f"[XTTS] 載入磁碟緩存的說話者特徵: {speaker_wav}")
+            gpt_cond_latent, speaker_embedding = cached
+        else:
+            print(f"[XTTS] 計算說話者特徵: {speaker_wav}")
+            with self._model_lock, torch.inference_mode():
+                gpt_cond_latent, speaker_embedding = self.model.get_conditioning_latents(
+                    speaker_wav
+                )
+            if disk_path:
+                self._save_cached_latents(disk_path, gpt_cond_latent, speaker_embedding)
         
         if use_cache:
-            self._speaker_cache[cache_key] = (gpt_cond_latent, speaker_embedding)
+            self._cache_speaker(cache_key, (gpt_cond_latent, speaker_embedding))
         
         return gpt_cond_latent, speaker_embedding
     
-    def get_speaker_embedding_dict(self, speaker_wav: str) -> dict:
+    def _cache_speaker(self, cache_key: str, latents: Tuple[torch.Tensor, torch.Tensor]):
+        """
+        放入記憶體緩存，超過上限時淘汰最久未使用的說話者
+        
+        被淘汰的特徵仍留在磁碟緩存，下次使用時從磁碟載入，不必重新計算
+        """
+        self._speaker_cache[cache_key] = latents
+        self._speaker_cache.move_to_end(cache_key)
+        evicted = False
+        while len(self._speaker_cache) > self.speaker_cache_size:
+            old_key, _ = self._speaker_cache.popitem(last=False)
+            print(f"[XTTS] 淘汰緩存的說話者特徵: {old_key}")
+            evicted = True
+        if evicted and self.device_type == "cuda":
+            # 歸還被淘汰張量佔用的顯存
+            torch.cuda.empty_cache()
+    
+    def precompute_conditioning_latents(self, directory: str) -> int:
+        """
+        預先計算資料夾內所有 .wav 的說話者特徵並寫入磁碟緩存
+        
+        Args:
+            directory: 參考語音資料夾
+            
+        Returns:
+            處理的檔案數量
+        """
+        wav_files = sorted(glob.glob(os.path.join(directory, "*.wav")))
+        for wav_path in wav_files:
+            self.get_conditioning_latents(wav_path)
+        print(f"[XTTS] 已預先計算 {len(wav_files)} 個說話者特徵")
+        return len(wav_files)
+    
+    def get_speaker_embedding_dict(self, speaker_wav: str, use_cache: bool = True) -> dict:
         """
         取得說話者特徵字典（可用於 API 傳輸）
         
         Args:
             speaker_wav: 參考語音檔案路徑
+            use_cache: 是否使用緩存
             
         Returns:
-            包含 gpt_cond_latent 和 speaker_embedding 的字典
+            包含 gpt_cond_latent 和 speaker_embedding 的字典，
+            各自為 encode_tensor 格式（fp16 原始位元組的 base64）
         """
-        gpt_cond_latent, speaker_embedding = self.get_conditioning_latents(speaker_wav)
+        gpt_cond_latent, speaker_embedding = self.get_conditioning_latents(speaker_wav, use_cache)
         return {
-            "gpt_cond_latent": gpt_cond_latent.cpu().squeeze().half().tolist(),
-            "speaker_embedding": speaker_embedding.cpu().squeeze().half().tolist(),
+            "gpt_cond_latent": self.encode_tensor(gpt_cond_latent.squeeze()),
+            "speaker_embedding": self.encode_tensor(speaker_embedding.squeeze()),
         }
     
     @staticmethod
@@ -133,19 +604,63 @@ class XTTSStreamingTTS:
         """
         後處理波形資料
         
+        裁切、縮放與轉型都在張量所在裝置上完成，只有 int16 結果會複製回 CPU。
+        輸入張量視為由本函式接管：float32 輸入會被就地裁切與縮放，不另外複製。
+        
         Args:
-            wav: 原始波形張量
+            wav: 原始波形張量（推理輸出，呼叫後不應再使用）
             
         Returns:
-            處理後的 int16 numpy 陣列
+            處理後的一維 int16 numpy 陣列
+        """
+        return XTTSStreamingTTS.to_int16(wav).cpu().numpy()
+    
+    @staticmethod
+    def to_int16(wav: torch.Tensor) -> torch.Tensor:
+        """
+        在張量所在裝置上裁切、縮放並轉為 int16（postprocess 的裝置端部分）
+        
+        Args:
+            wav: 原始波形張量或張量 list（推理輸出，呼叫後不應再使用）
+            
+        Returns:
+            同裝置上的一維 int16 張量
         """
         if isinstance(wav, list):
             wav = torch.cat(wav, dim=0)
-        wav = wav.clone().detach().cpu().numpy()
-        wav = wav[None, : int(wav.shape[0])]
-        wav = np.clip(wav, -1, 1)
-        wav = (wav * 32767).astype(np.int16)
-        return wav
+        # 推理輸出是 inference tensor，須在 inference_mode 內才能就地修改
+        with torch.inference_mode():
+            # 先轉 float32，避免 fp16 波形在縮放到 int16 時失去精度（float32 時不複製）
+            return wav.float().clamp_(-1, 1).mul_(32767.0).to(torch.int16)
+    
+    def _copy_to_host(self, wav: torch.Tensor, ready: Optional[torch.cuda.Event]) -> np.ndarray:
+        """
+        在專用的 copy stream 上將波形轉為 int16 並複製到 pinned 記憶體
+        
+        copy stream 只等待該區塊的 ready event，不會等到背景執行緒之後才排入的 GPT 運算；
+        int16 轉換與 D2H 複製都不排在推理 stream 上，主機端只等待這次複製完成的 event。
+        
+        Args:
+            wav: 推理輸出的波形張量（呼叫後不應再使用）
+            ready: _prefetch 記錄的區塊完成 event；為 None 時直接在目前 stream 上轉換並複製
+            
+        Returns:
+            一維 int16 numpy 陣列
+        """
+        if ready is None:
+            return self.to_int16(wav).cpu().numpy()
+        
+        with torch.cuda.stream(self._copy_stream):
+            self._copy_stream.wait_event(ready)
+            pcm = self.to_int16(wav)
+            host = torch.empty(pcm.shape, dtype=pcm.dtype, pin_memory=True)
+            host.copy_(pcm, non_blocking=True)
+            # wav 配置於推理 stream，告知快取配置器它仍被 copy stream 使用，避免過早回收
+            wav.record_stream(self._copy_stream)
+            copied = torch.cuda.Event()
+            copied.record(self._copy_stream)
+        copied.synchronize()
+        return host.numpy()
     
     @staticmethod
     def encode_audio_to_wav(
@@ -157,8 +672,10 @@ class XTTSStreamingTTS:
         """
         將原始音訊資料編碼為 WAV 格式
         
+        直接依資料長度打包標頭再與 PCM 串接，PCM 只會被複製一次
+        
         Args:
-            audio_data: 原始音訊位元組
+            audio_data: 原始音訊位元組（bytes、memoryview 等 buffer 物件皆可）
             sample_rate: 採樣率
             sample_width: 採樣寬度（位元組）
             channels: 通道數
@@ -166,14 +683,32 @@ class XTTSStreamingTTS:
         Returns:
             WAV 格式的位元組資料
         """
-        wav_buf = io.BytesIO()
-        with wave.open(wav_buf, "wb") as vfout:
-            vfout.setnchannels(channels)
-            vfout.setsampwidth(sample_width)
-            vfout.setframerate(sample_rate)
-            vfout.writeframes(audio_data)
-        wav_buf.seek(0)
-        return wav_buf.read()
+        data_size = memoryview(audio_data).nbytes
+        header = _pack_wav_header(36 + data_size, data_size, sample_rate, sample_width, channels)
+        return b"".join((header, audio_data))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def streaming_wav_header(
+        sample_rate: int = 24000,
+        sample_width: int = 2,
+        channels: int = 1
+    ) -> bytes:
+        """
+        產生串流用的 44 位元組 PCM WAV 標頭
+        
+        總長度未知，RIFF 與 data 的大小欄位依慣例填 0xFFFFFFFF，
+        播放器會一路讀取到串流結束。標頭只由參數決定，結果會被快取。
+        
+        Args:
+            sample_rate: 採樣率
+            sample_width: 採樣寬度（位元組）
+            channels: 通道數
+            
+        Returns:
+            WAV 標頭位元組
+        """
+        return _pack_wav_header(0xFFFFFFFF, 0xFFFFFFFF, sample_rate, sample_width, channels)
     
     def tts_stream(
         self,
@@ -182,8 +717,9 @@ class XTTSStreamingTTS:
         language: str = "zh-cn",
         stream_chunk_size: int = 20,
         add_wav_header: bool = True,
-        enable_text_splitting: bool = True
-    ) -> Iterator[bytes]:
+        enable_text_splitting: bool = True,
+        zero_copy: bool = False
+    ) -> Iterator[Union[bytes, memoryview]]:
         """
         串流生成語音
         
@@ -194,15 +730,57 @@ class XTTSStreamingTTS:
             stream_chunk_size: 串流區塊大小（越小延遲越低，但品質可能下降）
             add_wav_header: 是否在第一個區塊添加 WAV 標頭
             enable_text_splitting: 是否啟用文字分割
+            zero_copy: PCM 區塊是否以唯讀 memoryview 交出（省去複製成 bytes，
+                適用於接受 buffer 物件的消費端，如檔案寫入或 ASGI）
             
         Yields:
-            音訊區塊位元組
+            音訊區塊位元組（zero_copy 時 PCM 區塊為 memoryview）
         """
         print(f"[XTTS] 串流生成開始: {text[:50]}...")
         
         # 取得說話者特徵
         gpt_cond_latent, speaker_embedding = self.get_conditioning_latents(speaker_wav)
         
+        yield from self.tts_stream_from_latents(
+            text,
+            gpt_cond_latent,
+            speaker_embedding,
+            language=language,
+            stream_chunk_size=stream_chunk_size,
+            add_wav_header=add_wav_header,
+            enable_text_splitting=enable_text_splitting,
+            zero_copy=zero_copy
+        )
+        
+        print("[XTTS] 串流生成完成")
+    
+    def tts_stream_tensors(
+        self,
+        text: str,
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor,
+        language: str = "zh-cn",
+        stream_chunk_size: int = 20,
+        enable_text_splitting: bool = True
+    ) -> Iterator[torch.Tensor]:
+        """
+        串流生成原始波形張量（不轉 int16、不複製回 CPU）
+        
+        供後續仍在 GPU 上處理的流程使用（重取樣、混音、接其他模型），
+        省去 int16 轉換與兩次 PCIe 往返。
+        
+        Args:
+            text: 要轉換的文字
+            gpt_cond_latent: GPT 條件潛向量張量
+            speaker_embedding: 說話者嵌入向量張量
+            language: 語言代碼
+            stream_chunk_size: 串流區塊大小
+            enable_text_splitting: 是否啟用文字分割
+            
+        Yields:
+            模型裝置上的一維 float 波形張量（24 kHz，範圍約 -1~1）；
+            為 inference tensor，需在 torch.inference_mode() 內才能就地修改
+        """
         # 使用串流推理
         chunks = self.model.inference_stream(
             text,
@@ -212,32 +790,74 @@ class XTTSStreamingTTS:
             stream_chunk_size=stream_chunk_size,
             enable_text_splitting=enable_text_splitting
         )
+        yield from self._prefetch(chunks)
+    
+    def tts_stream_from_latents(
+        self,
+        text: str,
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor,
+        language: str = "zh-cn",
+        stream_chunk_size: int = 20,
+        add_wav_header: bool = True,
+        enable_text_splitting: bool = True,
+        zero_copy: bool = False
+    ) -> Iterator[Union[bytes, memoryview]]:
+        """
+        使用已在裝置上的特徵張量串流生成語音
+        
+        Args:
+            text: 要轉換的文字
+            gpt_cond_latent: GPT 條件潛向量張量
+            speaker_embedding: 說話者嵌入向量張量
+            language: 語言代碼
+            stream_chunk_size: 串流區塊大小
+            add_wav_header: 是否在第一個區塊添加 WAV 標頭
+            enable_text_splitting: 是否啟用文字分割
+            zero_copy: PCM 區塊是否以唯讀 memoryview 交出（省去複製成 bytes，
+                適用於接受 buffer 物件的消費端，如檔案寫入或 ASGI）
+            
+        Yields:
+            音訊區塊位元組（zero_copy 時 PCM 區塊為 memoryview）
+        """
+        chunks = self.model.inference_stream(
+            text,
+            language,
+            gpt_cond_latent,
+            speaker_embedding,
+            stream_chunk_size=stream_chunk_size,
+            enable_text_splitting=enable_text_splitting
+        )
         
-        for i, chunk in enumerate(chunks):
-            chunk = self.postprocess(chunk)
+        for i, (wav, ready) in enumerate(self._prefetch(chunks, record_events=True)):
+            pcm = self._copy_to_host(wav, ready)
+            # 每個區塊都是新配置的連續 int16 陣列，memoryview 在下一次 next() 後仍然有效
+            chunk = memoryview(pcm).cast("B") if zero_copy else pcm.tobytes()
             
             if i == 0 and add_wav_header:
                 # 第一個區塊添加 WAV 標頭
-                yield self.encode_audio_to_wav(b"", sample_rate=24000)
-                yield chunk.tobytes()
+                yield self.streaming_wav_header(24000, 2, 1)
+                yield chunk
             else:
-                yield chunk.tobytes()
-        
-        print("[XTTS] 串流生成完成")
+                yield chunk
     
     def tts_stream_from_embedding(
         self,
         text: str,
-        gpt_cond_latent: List[List[float]],
-        speaker_embedding: List[float],
+        gpt_cond_latent: Union[dict, List[List[float]], np.ndarray, torch.Tensor],
+        speaker_embedding: Union[dict, List[float], np.ndarray, torch.Tensor],
         language: str = "zh-cn",
         stream_chunk_size: int = 20,
         add_wav_header: bool = True,
-        enable_text_splitting: bool = True
-    ) -> Iterator[bytes]:
+        enable_text_splitting: bool = True,
+        zero_copy: bool = False
+    ) -> Iterator[Union[bytes, memoryview]]:
         """
         使用預先計算的特徵串流生成語音
         
+        特徵可為 get_speaker_embedding_dict 輸出的 encode_tensor 字典、list、numpy 陣列或張量，
+        fp16 輸入會直接上傳並在裝置上轉回 float32
+        
         Args:
             text: 要轉換的文字
             gpt_cond_latent: GPT 條件潛向量
@@ -246,31 +866,26 @@ class XTTSStreamingTTS:
             stream_chunk_size: 串流區塊大小
             add_wav_header: 是否在第一個區塊添加 WAV 標頭
             enable_text_splitting: 是否啟用文字分割
+            zero_copy: PCM 區塊是否以唯讀 memoryview 交出（省去複製成 bytes，
+                適用於接受 buffer 物件的消費端，如檔案寫入或 ASGI）
             
         Yields:
-            音訊區塊位元組
+            音訊區塊位元組（zero_copy 時 PCM 區塊為 memoryview）
         """
-        # 轉換為張量
-        speaker_emb = torch.tensor(speaker_embedding).unsqueeze(0).unsqueeze(-1)
-        gpt_latent = torch.tensor(gpt_cond_latent).reshape((-1, 1024)).unsqueeze(0)
+        # 轉換為裝置上的張量
+        speaker_emb = self._to_device_tensor(speaker_embedding).reshape(1, -1, 1)
+        gpt_latent = self._to_device_tensor(gpt_cond_latent).reshape(1, -1, 1024)
         
-        chunks = self.model.inference_stream(
+        yield from self.tts_stream_from_latents(
             text,
-            language,
             gpt_latent,
             speaker_emb,
+            language=language,
             stream_chunk_size=stream_chunk_size,
-            enable_text_splitting=enable_text_splitting
+            add_wav_header=add_wav_header,
+            enable_text_splitting=enable_text_splitting,
+            zero_copy=zero_copy
         )
-        
-        for i, chunk in enumerate(chunks):
-            chunk = self.postprocess(chunk)
-            
-            if i == 0 and add_wav_header:
-                yield self.encode_audio_to_wav(b"", sample_rate=24000)
-                yield chunk.tobytes()
-            else:
-                yield chunk.tobytes()
     
     def tts(
         self,
@@ -292,8 +907,28 @@ class XTTSStreamingTTS:
         print(f"[XTTS] 生成語音: {text[:50]}...")
         
         gpt_cond_latent, speaker_embedding = self.get_conditioning_latents(speaker_wav)
+        return self.tts_from_latents(text, gpt_cond_latent, speaker_embedding, language)
+    
+    def tts_from_latents(
+        self,
+        text: str,
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor,
+        language: str = "zh-cn"
+    ) -> bytes:
+        """
+        使用已在裝置上的特徵張量一次性生成完整語音
         
-        with torch.inference_mode():
+        Args:
+            text: 要轉換的文字
+            gpt_cond_latent: GPT 條件潛向量張量
+            speaker_embedding: 說話者嵌入向量張量
+            language: 語言代碼
+            
+        Returns:
+            完整的 WAV 音訊位元組
+        """
+        with self._model_lock, self._inference_context():
             out = self.model.inference(
                 text,
                 language,
@@ -301,8 +936,8 @@ class XTTSStreamingTTS:
                 speaker_embedding,
             )
         
-        wav = self.postprocess(torch.tensor(out["wav"]))
-        return self.encode_audio_to_wav(wav.tobytes())
+        wav = self.postprocess(torch.from_numpy(out["wav"]))
+        return self.encode_audio_to_wav(memoryview(wav).cast("B"))
     
     def tts_to_file(
         self,
@@ -350,28 +985,75 @@ class XTTSStreamingTTS:
         Returns:
             輸出檔案路徑
         """
-        with open(output_path, "wb") as f:
+        # 直接以檔案描述子寫入，區塊累積到 1 MB 才以 writev 一次寫出，不經過 stdio 緩衝
+        fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            pending = []
+            pending_size = 0
+            data_size = 0
             for chunk in self.tts_stream(
                 text,
                 speaker_wav,
                 language,
                 stream_chunk_size=stream_chunk_size,
-                add_wav_header=True
+                add_wav_header=True,
+                zero_copy=True
             ):
-                f.write(chunk)
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size >= WRITE_BUFFER_SIZE:
+                    self._write_buffers(fd, pending)
+                    data_size += pending_size
+                    pending, pending_size = [], 0
+            self._write_buffers(fd, pending)
+            data_size += pending_size
+            
+            # 檔案長度已知，將串流標頭的大小欄位改寫為實際值；
+            # 沒有產生任何區塊（例如空白文字）時連標頭都沒有寫入，不需改寫
+            if data_size >= 44:
+                data_size -= 44
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, _pack_wav_header(36 + data_size, data_size, 24000, 2, 1))
+        finally:
+            os.close(fd)
         print(f"[XTTS] 串流語音已儲存: {output_path}")
         return output_path
+    
+    @staticmethod
+    def _write_buffers(fd: int, buffers: list):
+        """將多個 buffer 完整寫入檔案描述子（支援時使用 os.writev，並處理部分寫入）"""
+        views = [memoryview(b).cast("B") for b in buffers]
+        while views:
+            if hasattr(os, "writev"):
+                written = os.writev(fd, views)
+            else:
+                # Windows 沒有 writev
+                written = os.write(fd, views[0])
+            while views and written >= len(views[0]):
+                written -= len(views[0])
+                views.pop(0)
+            if views and written:
+                views[0] = views[0][written:]
+
+
+# 不需建立模型即可使用的音訊工具
+postprocess = XTTSStreamingTTS.postprocess
+encode_audio_to_wav = XTTSStreamingTTS.encode_audio_to_wav
+streaming_wav_header = XTTSStreamingTTS.streaming_wav_header
 
 
 # 全域實例（可選用）
 _global_tts: Optional[XTTSStreamingTTS] = None
+_global_tts_lock = threading.Lock()
 
 
 def get_tts_instance() -> XTTSStreamingTTS:
-    """取得或建立全域 TTS 實例"""
+    """取得或建立全域 TTS 實例（多執行緒同時呼叫時只會載入一次模型）"""
     global _global_tts
     if _global_tts is None:
-        _global_tts = XTTSStreamingTTS()
+        with _global_tts_lock:
+            if _global_tts is None:
+                _global_tts = XTTSStreamingTTS()
     return _global_tts
 
 
@@ -936,21 +936,11 @@ async function startProcessing(userText) {
             throw new Error(`API 錯誤: ${response.status}`);
         }
 
-        // 取得 AI 回應文字（從 header）
-        const aiResponseHeader = response.headers.get('X-AI-Response');
-        let aiResponse = '';
-        if (aiResponseHeader) {
-            aiResponse = decodeURIComponent(aiResponseHeader);
-            console.log('[API] AI 回應:', aiResponse);
-        }
-
-        // 取得預估 chunk 數量（從 header）
-        const estimatedChunksHeader = response.headers.get('X-Estimated-Chunks');
-        const estimatedChunks = estimatedChunksHeader ? parseInt(estimatedChunksHeader) : 10;
-        console.log('[API] 預估 chunks:', estimatedChunks);
+        // 取得串流 ID（回應文字在音訊串流結束後才會就緒）
+        const streamId = response.headers.get('X-Stream-Id');
 
         // 改為：等待完全接收後再播放
-        await startFullPlayback(response, aiResponse || '收到回應');
+        await startFullPlayback(response, streamId);
 
     } catch (error) {
         console.error('[API] 錯誤:', error);
@@ -1002,7 +992,26 @@ let progressInterval = null;
 // ============================================
 // FULL PLAYBACK - 完全接收後播放（非串流）
 // ============================================
-async function startFullPlayback(response, aiResponse) {
+// 取得串流請求的完整 AI 回應文字
+async function fetchStreamText(streamId) {
+    if (!streamId) return '';
+
+    try {
+        const response = await fetch(`${CONFIG.apiBaseUrl}/api/chat/stream/${streamId}/text`, {
+            headers: { 'ngrok-skip-browser-warning': 'true' }
+        });
+        if (!response.ok) return '';
+
+        const data = await response.json();
+        console.log('[API] AI 回應:', data.ai_response);
+        return data.ai_response || '';
+    } catch (error) {
+        console.error('[API] 無法取得回應文字:', error);
+        return '';
+    }
+}
+
+async function startFullPlayback(response, streamId) {
     // 保持 PROCESSING 狀態
     elements.progressContainer.classList.add('visible');
     elements.progressFill.style.width = '0%';
@@ -1026,6 +1035,9 @@ async function startFullPlayback(response, aiResponse) {
 
     console.log(`[Audio] 接收完成，總大小: ${(receivedLength / 1024).toFixed(1)} KB`);
 
+    // 音訊接收完畢後，回應文字已就緒
+    const aiResponse = (await fetchStreamText(streamId)) || '收到回應';
+
     // 合併 Buffer
     const allChunks = new Uint8Array(receivedLength);
     let position = 0;